@@ -1,7 +1,10 @@
+import math
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from datetime import datetime, date
+import events
+import hr_series
 import storage
 
 app = Flask(__name__)
@@ -25,22 +28,7 @@ def init():
 def get_dashboard():
     """Get dashboard stats and streaks"""
     try:
-        stats = storage.get_stats()
-        weekly_kcal, weekly_goal = storage.get_weekly_calories()
-
-        return jsonify({
-            "stats": stats,
-            "streaks": {
-                "reading": storage.get_reading_streak(),
-                "kefir": storage.get_kefir_streak(),
-                "water": storage.get_water_streak(),
-            },
-            "compliance": storage.get_compliance_rate(days=7),
-            "weekly_calories": {
-                "current": weekly_kcal,
-                "goal": weekly_goal,
-            },
-        }), 200
+        return jsonify(storage.get_dashboard()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -75,6 +63,24 @@ def add_training():
             if field not in data:
                 return jsonify({"error": f"Missing field: {field}"}), 400
 
+        try:
+            datetime.fromisoformat(data['date'])
+        except (TypeError, ValueError):
+            return jsonify({"error": f"Invalid date: {data['date']}"}), 400
+
+        # Optional per-second HR trace from the watch
+        hr_blob = None
+        hr_interval_sec = data.get('hr_interval_sec', 1.0)
+        if data.get('hr_samples') is not None:
+            if (isinstance(hr_interval_sec, bool) or not isinstance(hr_interval_sec, (int, float))
+                    or not math.isfinite(hr_interval_sec)
+                    or not 0 < hr_interval_sec <= hr_series.MAX_INTERVAL_SEC):
+                return jsonify({"error": f"hr_interval_sec must be > 0 and <= {hr_series.MAX_INTERVAL_SEC}"}), 400
+            try:
+                hr_blob = hr_series.encode(data['hr_samples'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
         training_id = storage.add_training(
             date=data['date'],
             duration_min=data['duration_min'],
@@ -82,7 +88,9 @@ def add_training():
             avg_hr=data['avg_hr'],
             max_hr=data['max_hr'],
             training_effect=data['training_effect'],
-            notes=data.get('notes', '')
+            notes=data.get('notes', ''),
+            hr_blob=hr_blob,
+            hr_interval_sec=hr_interval_sec,
         )
 
         return jsonify({
@@ -96,6 +104,28 @@ def add_training():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/trainings/search', methods=['GET'])
+def search_trainings():
+    """Full-text search over training notes"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Missing q"}), 400
+
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        cursor = request.args.get('cursor')
+        results, next_cursor = storage.search_trainings(query, limit=limit, cursor=cursor)
+        return jsonify({
+            "results": results,
+            "count": len(results),
+            "next_cursor": next_cursor,
+        }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/trainings/<int:training_id>', methods=['GET'])
 def get_training(training_id):
     """Get single training by ID"""
@@ -108,6 +138,19 @@ def get_training(training_id):
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/trainings/<int:training_id>/hr', methods=['GET'])
+def get_training_hr(training_id):
+    """Get HR series of a training with zone analysis (?samples=0 for analysis only)"""
+    try:
+        include_samples = request.args.get('samples', '1') != '0'
+        hr = storage.get_training_hr(training_id, include_samples=include_samples)
+        if not hr:
+            return jsonify({"error": "HR series not found"}), 404
+        return jsonify(hr), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/trainings/<int:training_id>', methods=['DELETE'])
 def delete_training(training_id):
     """Delete training by ID"""
@@ -132,6 +175,8 @@ def log_reading():
 
         storage.log_reading(data['date'], data['minutes'])
         return jsonify({"status": "success"}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -146,6 +191,8 @@ def log_water():
 
         storage.log_water(data['date'], data['glasses'])
         return jsonify({"status": "success"}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -160,6 +207,8 @@ def log_kefir():
 
         storage.log_kefir(data['date'], data['glasses'])
         return jsonify({"status": "success"}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -175,6 +224,8 @@ def log_no_phone_after_21():
         success = 1 if data['success'] else 0
         storage.log_no_phone_after_21(data['date'], success)
         return jsonify({"status": "success"}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -219,6 +270,76 @@ def get_daily_logs_range():
         return jsonify({"error": str(e)}), 500
 
 
+# ========== GOALS ==========
+
+@app.route('/api/goals', methods=['GET'])
+def get_goals():
+    """Get all goals with progress for current period"""
+    try:
+        goals = storage.get_goals(on_date=request.args.get('date'))
+        return jsonify({
+            "goals": goals,
+            "count": len(goals),
+        }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/goals', methods=['POST'])
+def set_goal():
+    """Create goal or update its target"""
+    try:
+        data = request.json
+        if not data or 'metric' not in data or 'period' not in data or 'target' not in data:
+            return jsonify({"error": "Missing metric, period or target"}), 400
+
+        goal_id = storage.set_goal(data['metric'], data['period'], int(data['target']))
+        return jsonify({
+            "status": "success",
+            "goal_id": goal_id,
+        }), 201
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/goals/<int:goal_id>', methods=['DELETE'])
+def delete_goal(goal_id):
+    """Delete goal by ID"""
+    try:
+        success = storage.delete_goal(goal_id)
+        if not success:
+            return jsonify({"error": "Goal not found"}), 404
+        return jsonify({"status": "success"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ========== LIVE UPDATES ==========
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """Server-sent events with every storage write (replaces dashboard polling).
+
+    Each open stream blocks its worker while it waits for events. The dev server
+    gives it a thread; for many clients run gunicorn with gevent (see
+    gunicorn.conf.py), where a waiting stream is just a greenlet. The event
+    broker lives in one process, so that setup must stay at a single worker.
+    """
+    last_event_id = request.headers.get('Last-Event-ID')
+    return Response(
+        events.broker.stream(last_event_id),
+        mimetype='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # disable proxy buffering (nginx)
+        },
+    )
+
+
 # ========== HEALTH CHECK ==========
 
 @app.route('/api/health', methods=['GET'])
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+HISTORY_SIZE = 256  # events kept for clients reconnecting with Last-Event-ID
+HEARTBEAT_SEC = 15.0
+
+
+@dataclass
+class Event:
+    id: int
+    type: str  # e.g. training.added, training.deleted, daily_log.updated
+    payload: str  # JSON, serialized once at publish time and shared by all clients
+
+    def to_sse(self, epoch: str) -> str:
+        return f"id: {epoch}-{self.id}\nevent: {self.type}\ndata: {self.payload}\n\n"
+
+
+class EventBroker:
+    """In-process pub/sub for server-sent events.
+
+    Events go into one shared ring buffer; subscribers only remember the last
+    id they have seen and sleep on a condition until something newer arrives.
+    Publishing costs the same no matter how many clients are connected.
+
+    SSE ids are "<epoch>-<n>": n restarts at 1 with every process, so a
+    Last-Event-ID from another epoch always gets a resync event.
+    """
+
+    def __init__(self, history: int = HISTORY_SIZE):
+        self.epoch = str(int(time.time() * 1000))
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=history)
+        self._last_id = 0
+        self._subscribers = 0
+
+    @property
+    def last_id(self) -> int:
+        with self._cond:
+            return self._last_id
+
+    @property
+    def subscribers(self) -> int:
+        """Number of currently connected stream clients"""
+        with self._cond:
+            return self._subscribers
+
+    def publish(self, event_type: str, data: dict) -> Event:
+        """Append event and wake up all waiting subscribers"""
+        payload = json.dumps(data, default=str)
+        with self._cond:
+            self._last_id += 1
+            event = Event(self._last_id, event_type, payload)
+            self._events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def skip(self) -> None:
+        """Count an event nobody was listening for, without building it.
+
+        The buffer is dropped so a client reconnecting from before the gap
+        gets resync instead of a stream with a hole in it.
+        """
+        with self._cond:
+            self._last_id += 1
+            self._events.clear()
+
+    def wait(self, after_id: int, timeout: float) -> List[Event]:
+        """Events newer than after_id, blocking up to timeout if there are none yet"""
+        with self._cond:
+            if after_id > self._last_id:
+                return [Event(self._last_id, "resync", "{}")]
+            self._cond.wait_for(lambda: self._last_id > after_id, timeout=timeout)
+            if self._last_id == after_id:
+                return []
+
+            if not self._events or self._events[0].id > after_id + 1:
+                # Client fell behind the buffer (or missed skipped events) - refetch everything
+                return [Event(self._last_id, "resync", "{}")]
+            return [event for event in self._events if event.id > after_id]
+
+    def stream(self, last_event_id: Optional[str] = None, heartbeat: float = HEARTBEAT_SEC) -> Iterator[str]:
+        """Yield SSE-formatted events forever (comment lines keep idle connections alive)"""
+        with self._cond:
+            self._subscribers += 1
+        try:
+            cursor = self.last_id
+            yield "retry: 3000\n\n"
+            if last_event_id:
+                epoch, _, seq = last_event_id.partition("-")
+                if epoch == self.epoch and seq.isdigit():
+                    cursor = int(seq)
+                else:
+                    # Id from another process - its numbers mean nothing here
+                    yield Event(cursor, "resync", "{}").to_sse(self.epoch)
+
+            while True:
+                events = self.wait(cursor, timeout=heartbeat)
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in events:
+                    yield event.to_sse(self.epoch)
+                cursor = events[-1].id
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+
+broker = EventBroker()
+
+
+def publish(event_type: str, data: dict) -> Event:
+    """Publish event to all connected /api/stream clients"""
+    return broker.publish(event_type, data)
+
+
+def has_subscribers() -> bool:
+    """Whether anybody is connected to /api/stream right now"""
+    return broker.subscribers > 0
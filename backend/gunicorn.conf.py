@@ -0,0 +1,14 @@
+# Production server for the API, including /api/stream (server-sent events).
+#   cd backend && gunicorn -c gunicorn.conf.py app:app
+# gevent turns every open stream into a cheap greenlet instead of a blocked
+# thread (the worker monkey-patches threading, so events.EventBroker works as is).
+# Keep a single worker: the event broker is in-process, clients connected to
+# another worker would never see its events. gunicorn does not run on Windows -
+# use `python app.py` there.
+import os
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', 5000)}"
+workers = 1
+worker_class = "gevent"
+worker_connections = 1000  # max concurrent clients, open streams included
+timeout = 30  # streams send a keep-alive every 15 s, well inside this
@@ -0,0 +1,71 @@
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Blob layout: little-endian int16 deltas, first element is the first sample itself.
+# An hour at 1 Hz is 3600 * 2 B = ~7 KB, and decoding is one cumsum over a zero-copy view.
+BLOB_DTYPE = np.dtype("<i2")
+
+HR_MAX = int(os.getenv("HR_MAX", 190))  # user max HR, zone boundaries are % of it
+ZONE_BOUNDS = (0.5, 0.6, 0.7, 0.8, 0.9)  # zone 1 starts at 50% HRmax, zone 5 at 90%
+MAX_SAMPLES = 6 * 3600  # 6 h at 1 Hz
+MAX_INTERVAL_SEC = 60  # sparsest sampling accepted (1 sample per minute)
+
+
+def encode(samples: Sequence[int]) -> bytes:
+    """Pack HR samples (bpm, 0 = no reading) into delta-encoded int16 blob"""
+    hr = np.asarray(samples)
+    if hr.ndim != 1 or hr.size == 0:
+        raise ValueError("HR series must be a non-empty list of numbers")
+    if hr.size > MAX_SAMPLES:
+        raise ValueError(f"HR series too long (max {MAX_SAMPLES} samples)")
+    if not np.issubdtype(hr.dtype, np.number) or not np.isfinite(hr).all() or hr.min() < 0 or hr.max() > 255:
+        raise ValueError("HR samples must be numbers between 0 and 255")
+    if not (hr > 0).any():
+        raise ValueError("HR series has no valid samples")
+
+    hr = np.rint(hr).astype(np.int16)
+    return np.diff(hr, prepend=np.int16(0)).astype(BLOB_DTYPE).tobytes()
+
+
+def deltas(blob: bytes) -> np.ndarray:
+    """Zero-copy read-only view of the stored deltas"""
+    return np.frombuffer(blob, dtype=BLOB_DTYPE)
+
+
+def decode(blob: bytes) -> np.ndarray:
+    """Unpack blob back into HR samples (bpm)"""
+    return np.cumsum(deltas(blob), dtype=np.int16)
+
+
+def analyze(hr: np.ndarray, interval_sec: float = 1.0, hr_max: Optional[int] = None) -> dict:
+    """Time in zones and summary statistics of an HR series (0 samples are ignored)"""
+    hr_max = hr_max or HR_MAX
+    valid = hr[hr > 0]
+    if valid.size == 0:
+        raise ValueError("HR series has no valid samples")
+
+    # zones_sec[0] = below zone 1; np.digitize maps each sample to its zone in one pass
+    bounds = np.asarray(ZONE_BOUNDS) * hr_max
+    zones = np.bincount(np.digitize(valid, bounds), minlength=len(bounds) + 1) * interval_sec
+
+    # Drift: avg HR of second half vs first half (cardiac drift / decoupling)
+    half = valid.size // 2
+    drift_pct = 0.0
+    if half:
+        first, second = valid[:half].mean(), valid[half:].mean()
+        drift_pct = float((second - first) / first * 100)
+
+    return {
+        "hr_max": hr_max,
+        "samples": int(hr.size),
+        "duration_sec": float(hr.size * interval_sec),
+        "min_hr": int(valid.min()),
+        "avg_hr": round(float(valid.mean()), 1),
+        "max_hr": int(valid.max()),
+        "std_hr": round(float(valid.std()), 1),
+        "drift_pct": round(drift_pct, 2),
+        "zones_sec": [float(sec) for sec in zones],
+    }
+
@@ -1,9 +1,26 @@
+import json
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime, date, timedelta
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
+
+import events
+import hr_series
 
 DB_PATH = "wellness.db"
+SCHEMA_VERSION = 2  # bump together with a new step in _migrate()
+SEARCH_MAX_RANKED = 1000  # most recent matches scored by search_trainings()
+
+GOAL_PERIODS = ("day", "week", "month")
+TRAINING_GOAL_METRICS = ("trainings", "calories", "duration_min")
+DAILY_GOAL_METRICS = ("reading_minutes", "water_glasses", "kefir_glasses", "no_phone_after_21")
+DEFAULT_GOALS = [
+    ("calories", "week", 1500),
+    ("water_glasses", "day", 6),
+    ("reading_minutes", "day", 60),
+    ("kefir_glasses", "day", 2),
+    ("no_phone_after_21", "day", 1),
+]
 
 
 @dataclass
@@ -68,13 +85,99 @@ def init_db():
             )
         """)
 
+        # Goals (target per metric and period) and their progress counters
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS goals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                metric TEXT NOT NULL,
+                period TEXT NOT NULL,
+                target INTEGER NOT NULL,
+                UNIQUE (metric, period)
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS goal_progress (
+                goal_id INTEGER NOT NULL,
+                period_start TEXT NOT NULL,  -- ISO date of first day in period
+                value INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (goal_id, period_start)
+            )
+        """)
+
+        # Per-second HR trace of a training (optional, one row per training)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS training_hr (
+                training_id INTEGER PRIMARY KEY,
+                interval_sec REAL NOT NULL DEFAULT 1.0,
+                samples BLOB NOT NULL,  -- hr_series.encode()
+                analysis TEXT  -- cached hr_series.analyze() as JSON
+            )
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS training_hr_delete AFTER DELETE ON trainings BEGIN
+                DELETE FROM training_hr WHERE training_id = old.id;
+            END
+        """)
+
+        # Full-text index over training notes (external content, kept in sync by triggers)
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS trainings_fts USING fts5(
+                notes,
+                content='trainings',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS trainings_fts_insert AFTER INSERT ON trainings BEGIN
+                INSERT INTO trainings_fts (rowid, notes) VALUES (new.id, new.notes);
+            END
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS trainings_fts_delete AFTER DELETE ON trainings BEGIN
+                INSERT INTO trainings_fts (trainings_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+            END
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS trainings_fts_update AFTER UPDATE OF notes ON trainings BEGIN
+                INSERT INTO trainings_fts (trainings_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+                INSERT INTO trainings_fts (rowid, notes) VALUES (new.id, new.notes);
+            END
+        """)
+
+        _migrate(cur)
         con.commit()
 
 
+def _migrate(cur) -> None:
+    """Apply pending data migrations (tracked in PRAGMA user_version)"""
+    version = cur.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    if version < 1:
+        # Backfill full-text index for trainings added before it existed
+        cur.execute("INSERT INTO trainings_fts (trainings_fts) VALUES ('rebuild')")
+
+    if version < 2:
+        # Replace hard-coded targets with stored goals, counted from existing rows
+        for metric, period, target in DEFAULT_GOALS:
+            cur.execute("INSERT OR IGNORE INTO goals (metric, period, target) VALUES (?, ?, ?)", (metric, period, target))
+            cur.execute("SELECT id FROM goals WHERE metric = ? AND period = ?", (metric, period))
+            _backfill_goal_progress(cur, cur.fetchone()[0], metric, period)
+
+    cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
 # ========== TRAININGS ==========
 
-def add_training(date: str, duration_min: int, calories: int, avg_hr: int, max_hr: int, training_effect: float, notes: str = "") -> int:
-    """Add new training, return training ID"""
+def add_training(date: str, duration_min: int, calories: int, avg_hr: int, max_hr: int, training_effect: float, notes: str = "",
+                 hr_blob: Optional[bytes] = None, hr_interval_sec: float = 1.0) -> int:
+    """Add new training, return training ID (hr_blob: optional hr_series.encode() trace)"""
+    hr_analysis = None
+    if hr_blob is not None:
+        hr_analysis = json.dumps(hr_series.analyze(hr_series.decode(hr_blob), hr_interval_sec))
+
     with connect() as con:
         cur = con.cursor()
         try:
@@ -82,12 +185,22 @@ def add_training(date: str, duration_min: int, calories: int, avg_hr: int, max_h
                 INSERT INTO trainings (date, duration_min, calories, avg_hr, max_hr, training_effect, notes)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (date, duration_min, calories, avg_hr, max_hr, training_effect, notes))
+            training_id = cur.lastrowid
+            if hr_blob is not None:
+                cur.execute("""
+                    INSERT INTO training_hr (training_id, interval_sec, samples, analysis)
+                    VALUES (?, ?, ?, ?)
+                """, (training_id, hr_interval_sec, hr_blob, hr_analysis))
+            for metric, value in _training_goal_values(calories, duration_min).items():
+                _bump_goal_progress(cur, metric, date, value)
             con.commit()
-            return cur.lastrowid
         except sqlite3.IntegrityError:
             # Training for this date already exists
             raise ValueError(f"Training for date {date} already exists")
 
+    _publish("training.added", lambda: {"training": get_training(training_id)})
+    return training_id
+
 
 def get_trainings(limit: int = 200) -> List[dict]:
     """Get all trainings (most recent first)"""
@@ -119,9 +232,125 @@ def delete_training(training_id: int) -> bool:
     """Delete training by ID"""
     with connect() as con:
         cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute("""
+            SELECT id, date, duration_min, calories, avg_hr, max_hr, training_effect, notes
+            FROM trainings
+            WHERE id = ?
+        """, (training_id,))
+        row = cur.fetchone()
+        if not row:
+            con.rollback()
+            return False
+
         cur.execute("DELETE FROM trainings WHERE id = ?", (training_id,))
+        for metric, value in _training_goal_values(row["calories"], row["duration_min"]).items():
+            _bump_goal_progress(cur, metric, row["date"], -value)
         con.commit()
-        return cur.rowcount > 0
+
+    _publish("training.deleted", lambda: {"training": dict(row)})
+    return True
+
+
+def get_training_hr(training_id: int, include_samples: bool = True) -> Optional[dict]:
+    """Get HR series analysis (and samples) of a training, None if it has no series"""
+    with connect() as con:
+        cur = con.cursor()
+        cur.execute("""
+            SELECT interval_sec, samples, analysis FROM training_hr
+            WHERE training_id = ?
+        """, (training_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+
+        hr = hr_series.decode(row["samples"])
+        analysis = json.loads(row["analysis"]) if row["analysis"] else None
+        if not analysis or analysis["hr_max"] != hr_series.HR_MAX:
+            # Cache missing or computed for different zones - refresh it
+            analysis = hr_series.analyze(hr, row["interval_sec"])
+            cur.execute("UPDATE training_hr SET analysis = ? WHERE training_id = ?", (json.dumps(analysis), training_id))
+            con.commit()
+
+    result = {
+        "training_id": training_id,
+        "interval_sec": row["interval_sec"],
+        "analysis": analysis,
+    }
+    if include_samples:
+        result["samples"] = hr.tolist()
+    return result
+
+
+def _fts_query(query: str) -> str:
+    """Turn free text into a safe FTS5 query (all terms required, trailing * = prefix match)"""
+    terms = []
+    for term in query.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("Search query is empty")
+    return " ".join(terms)
+
+
+def search_trainings(query: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Full-text search over training notes, best match first.
+
+    Only the SEARCH_MAX_RANKED most recent matches are ranked, so a common term
+    costs the same as a rare one. The first page fixes that candidate window
+    (lowest rowid) and the cursor carries it, so later pages rank the same set.
+
+    Pagination is keyset based: pass the returned cursor to get the next page.
+    The cursor holds the bm25 rank of the last row, and bm25 depends on statistics
+    of all indexed notes - the (rank, id) order is only stable while no trainings
+    are added or deleted. A write between page requests can make later pages
+    skip or repeat rows; start the search over after such a change.
+    Returns (results, next_cursor); next_cursor is None on the last page.
+    """
+    match = _fts_query(query)
+    params = [match]
+    after = ""
+
+    with connect() as con:
+        cur = con.cursor()
+        if cursor:
+            try:
+                min_id, last_rank, last_id = cursor.split(":")
+                min_id, last_rank, last_id = int(min_id), float(last_rank), int(last_id)
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            after = "AND (trainings_fts.rank > ? OR (trainings_fts.rank = ? AND trainings_fts.rowid > ?))"
+            params += [last_rank, last_rank, last_id]
+        else:
+            # Walking the index by rowid is cheap, scoring every match is not
+            cur.execute("""
+                SELECT rowid FROM trainings_fts
+                WHERE trainings_fts MATCH ?
+                ORDER BY rowid DESC
+                LIMIT 1 OFFSET ?
+            """, (match, SEARCH_MAX_RANKED - 1))
+            row = cur.fetchone()
+            min_id = row[0] if row else 0
+
+        cur.execute(f"""
+            SELECT t.id, t.date, t.duration_min, t.calories, t.avg_hr, t.max_hr, t.training_effect, t.notes,
+                   snippet(trainings_fts, 0, '<mark>', '</mark>', '…', 12) AS snippet,
+                   trainings_fts.rank AS rank
+            FROM trainings_fts
+            JOIN trainings t ON t.id = trainings_fts.rowid
+            WHERE trainings_fts MATCH ? AND trainings_fts.rowid >= ? {after}
+            ORDER BY trainings_fts.rank, trainings_fts.rowid
+            LIMIT ?
+        """, (params[0], min_id, *params[1:], limit + 1))
+        rows = [dict(row) for row in cur.fetchall()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{min_id}:{rows[-1]['rank']!r}:{rows[-1]['id']}"
+    return rows, next_cursor
 
 
 def get_last_training_date() -> Optional[str]:
@@ -135,52 +364,50 @@ def get_last_training_date() -> Optional[str]:
 
 # ========== DAILY LOGS ==========
 
-def log_reading(reading_date: str, minutes: int) -> None:
-    """Log reading for a day"""
+def _set_daily_value(log_date: str, column: str, value: int) -> None:
+    """Upsert one daily_logs column and move goal counters by the change"""
+    try:
+        datetime.fromisoformat(log_date)
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date or value: {log_date}, {value}")
+
     with connect() as con:
         cur = con.cursor()
-        cur.execute("""
-            INSERT INTO daily_logs (date, reading_minutes)
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(f"SELECT {column} FROM daily_logs WHERE date = ?", (log_date,))
+        row = cur.fetchone()
+        previous = (row[0] or 0) if row else 0
+
+        cur.execute(f"""
+            INSERT INTO daily_logs (date, {column})
             VALUES (?, ?)
-            ON CONFLICT(date) DO UPDATE SET reading_minutes = ?
-        """, (reading_date, minutes, minutes))
+            ON CONFLICT(date) DO UPDATE SET {column} = excluded.{column}
+        """, (log_date, value))
+        _bump_goal_progress(cur, column, log_date, value - previous)
         con.commit()
 
+    _publish("daily_log.updated", lambda: {"log": get_daily_log(log_date)})
+
+
+def log_reading(reading_date: str, minutes: int) -> None:
+    """Log reading for a day"""
+    _set_daily_value(reading_date, "reading_minutes", minutes)
+
 
 def log_water(water_date: str, glasses: int) -> None:
     """Log water glasses for a day"""
-    with connect() as con:
-        cur = con.cursor()
-        cur.execute("""
-            INSERT INTO daily_logs (date, water_glasses)
-            VALUES (?, ?)
-            ON CONFLICT(date) DO UPDATE SET water_glasses = ?
-        """, (water_date, glasses, glasses))
-        con.commit()
+    _set_daily_value(water_date, "water_glasses", glasses)
 
 
 def log_kefir(kefir_date: str, glasses: int) -> None:
     """Log kefir glasses for a day"""
-    with connect() as con:
-        cur = con.cursor()
-        cur.execute("""
-            INSERT INTO daily_logs (date, kefir_glasses)
-            VALUES (?, ?)
-            ON CONFLICT(date) DO UPDATE SET kefir_glasses = ?
-        """, (kefir_date, glasses, glasses))
-        con.commit()
+    _set_daily_value(kefir_date, "kefir_glasses", glasses)
 
 
 def log_no_phone_after_21(log_date: str, success: int) -> None:
     """Log no phone after 21:00 for a day (1 = success, 0 = failed)"""
-    with connect() as con:
-        cur = con.cursor()
-        cur.execute("""
-            INSERT INTO daily_logs (date, no_phone_after_21)
-            VALUES (?, ?)
-            ON CONFLICT(date) DO UPDATE SET no_phone_after_21 = ?
-        """, (log_date, success, success))
-        con.commit()
+    _set_daily_value(log_date, "no_phone_after_21", success)
 
 
 def get_daily_log(log_date: str) -> Optional[dict]:
@@ -209,6 +436,154 @@ def get_daily_logs(start_date: str, end_date: str) -> List[dict]:
         return [dict(row) for row in cur.fetchall()]
 
 
+# ========== GOALS ==========
+
+def _period_start(day: str, period: str) -> str:
+    """First day of the day/week/month period containing given date"""
+    d = datetime.fromisoformat(day[:10]).date()
+    if period == "week":
+        d -= timedelta(days=d.weekday())  # weeks start on Monday
+    elif period == "month":
+        d = d.replace(day=1)
+    return d.isoformat()
+
+
+def _training_goal_values(calories: int, duration_min: int) -> dict:
+    """How much a single training contributes to each training goal metric"""
+    return {"trainings": 1, "calories": calories, "duration_min": duration_min}
+
+
+def _bump_goal_progress(cur, metric: str, day: str, delta: int) -> None:
+    """Add delta to progress counters of all goals tracking metric (caller commits)"""
+    if not delta:
+        return
+    cur.execute("SELECT id, period FROM goals WHERE metric = ?", (metric,))
+    for goal_id, period in cur.fetchall():
+        cur.execute("""
+            INSERT INTO goal_progress (goal_id, period_start, value)
+            VALUES (?, ?, ?)
+            ON CONFLICT(goal_id, period_start) DO UPDATE SET value = value + excluded.value
+        """, (goal_id, _period_start(day, period), delta))
+
+
+def _backfill_goal_progress(cur, goal_id: int, metric: str, period: str) -> None:
+    """Rebuild progress counters of one goal from raw trainings / daily logs"""
+    if metric in TRAINING_GOAL_METRICS:
+        cur.execute("SELECT date, calories, duration_min FROM trainings")
+        rows = [(row[0], _training_goal_values(row[1], row[2])[metric]) for row in cur.fetchall()]
+    else:
+        cur.execute(f"SELECT date, {metric} FROM daily_logs WHERE {metric} > 0")
+        rows = cur.fetchall()
+
+    totals = {}
+    for day, value in rows:
+        start = _period_start(day, period)
+        totals[start] = totals.get(start, 0) + value
+
+    cur.execute("DELETE FROM goal_progress WHERE goal_id = ?", (goal_id,))
+    cur.executemany(
+        "INSERT INTO goal_progress (goal_id, period_start, value) VALUES (?, ?, ?)",
+        [(goal_id, start, value) for start, value in totals.items()],
+    )
+
+
+def set_goal(metric: str, period: str, target: int) -> int:
+    """Create goal or update its target, return goal ID"""
+    if metric not in TRAINING_GOAL_METRICS + DAILY_GOAL_METRICS:
+        raise ValueError(f"Unknown goal metric: {metric}")
+    if period not in GOAL_PERIODS:
+        raise ValueError(f"Unknown goal period: {period}")
+    if target <= 0:
+        raise ValueError("Goal target must be > 0")
+
+    with connect() as con:
+        cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute("SELECT id FROM goals WHERE metric = ? AND period = ?", (metric, period))
+        row = cur.fetchone()
+        if row:
+            goal_id = row[0]
+            cur.execute("UPDATE goals SET target = ? WHERE id = ?", (target, goal_id))
+        else:
+            cur.execute("INSERT INTO goals (metric, period, target) VALUES (?, ?, ?)", (metric, period, target))
+            goal_id = cur.lastrowid
+            _backfill_goal_progress(cur, goal_id, metric, period)
+        con.commit()
+
+    _publish("goals.updated", dict)
+    return goal_id
+
+
+def delete_goal(goal_id: int) -> bool:
+    """Delete goal and its progress counters"""
+    with connect() as con:
+        cur = con.cursor()
+        cur.execute("DELETE FROM goals WHERE id = ?", (goal_id,))
+        deleted = cur.rowcount > 0
+        cur.execute("DELETE FROM goal_progress WHERE goal_id = ?", (goal_id,))
+        con.commit()
+
+    if deleted:
+        _publish("goals.updated", dict)
+    return deleted
+
+
+def get_goals(on_date: Optional[str] = None, metric: Optional[str] = None) -> List[dict]:
+    """Get all goals (or those of one metric) with progress for the period containing on_date (default today)"""
+    on_date = on_date or date.today().isoformat()
+
+    with connect() as con:
+        cur = con.cursor()
+        if metric:
+            cur.execute("SELECT id, metric, period, target FROM goals WHERE metric = ? ORDER BY period", (metric,))
+        else:
+            cur.execute("SELECT id, metric, period, target FROM goals ORDER BY period, metric")
+        goals = [dict(row) for row in cur.fetchall()]
+
+        for goal in goals:
+            goal["period_start"] = _period_start(on_date, goal["period"])
+            cur.execute(
+                "SELECT value FROM goal_progress WHERE goal_id = ? AND period_start = ?",
+                (goal["id"], goal["period_start"]),
+            )
+            row = cur.fetchone()
+            goal["current"] = row[0] if row else 0
+            goal["percent"] = min(int(goal["current"] / goal["target"] * 100), 100)
+            goal["achieved"] = goal["current"] >= goal["target"]
+
+    return goals
+
+
+def get_goal(metric: str, period: str) -> Optional[dict]:
+    """Get one goal with current progress, None if the goal is not set"""
+    for goal in get_goals(metric=metric):
+        if goal["period"] == period:
+            return goal
+    return None
+
+
+# ========== LIVE UPDATES ==========
+
+def _publish(event_type: str, build_data: Callable[[], dict]) -> None:
+    """Publish stream event after a committed write, with refreshed dashboard and goals.
+
+    Called once the write is already saved, so failures are only logged and
+    never turn a successful write into an error response. With no stream
+    clients connected the payload is not built at all.
+    """
+    if not events.has_subscribers():
+        events.broker.skip()
+        return
+
+    try:
+        data = build_data()
+        data["dashboard"] = get_dashboard()
+        data["goals"] = get_goals()
+        events.publish(event_type, data)
+    except Exception as e:
+        print(f"Event publish error ({event_type}): {e}")
+
+
 # ========== STATS & STREAKS ==========
 
 def days_since_last_training() -> int:
@@ -265,11 +640,15 @@ def get_kefir_streak() -> int:
     return streak
 
 
-def get_water_streak() -> int:
-    """Count consecutive days with water goal met (from today backwards)"""
+def get_water_streak() -> Optional[int]:
+    """Count consecutive days with water goal met (from today backwards), None without a daily water goal"""
+    goal = get_goal("water_glasses", "day")
+    if not goal:
+        return None
+
     streak = 0
     current_date = date.today()
-    WATER_GOAL = 6  # 6 glasses
+    water_goal = goal["target"]
 
     with connect() as con:
         cur = con.cursor()
@@ -278,7 +657,7 @@ def get_water_streak() -> int:
             cur.execute("SELECT water_glasses FROM daily_logs WHERE date = ?", (date_str,))
             row = cur.fetchone()
 
-            if row and row[0] >= WATER_GOAL:
+            if row and row[0] >= water_goal:
                 streak += 1
                 current_date -= timedelta(days=1)
             else:
@@ -308,21 +687,20 @@ def get_compliance_rate(days: int = 7) -> int:
     return int((active_days / days) * 100)
 
 
-def get_weekly_calories() -> Tuple[int, int]:
-    """Get total calories this week and weekly goal"""
-    start_date = (date.today() - timedelta(days=7)).isoformat()
-    end_date = date.today().isoformat()
+def get_weekly_calories() -> Tuple[int, Optional[int]]:
+    """Get total calories this week (from Monday) and weekly goal (None if not set)"""
+    goal = get_goal("calories", "week")
+    if goal:
+        # Same counter as /api/goals reports
+        return goal["current"], goal["target"]
 
+    start_date = _period_start(date.today().isoformat(), "week")
     with connect() as con:
         cur = con.cursor()
-        cur.execute("""
-            SELECT COALESCE(SUM(calories), 0) FROM trainings
-            WHERE date BETWEEN ? AND ?
-        """, (start_date, end_date))
+        cur.execute("SELECT COALESCE(SUM(calories), 0) FROM trainings WHERE date >= ?", (start_date,))
         total = cur.fetchone()[0]
 
-    weekly_goal = 1500  # Example: 1500 kcal per week
-    return int(total), weekly_goal
+    return int(total), None
 
 
 def get_stats() -> dict:
@@ -360,3 +738,21 @@ def get_stats() -> dict:
         "avg_training_effect": round(avg_effect, 2),
         "days_without_training": days_since_last_training(),
     }
+
+
+def get_dashboard() -> dict:
+    """Get dashboard payload: stats, streaks, compliance and weekly calories"""
+    weekly_kcal, weekly_goal = get_weekly_calories()
+    return {
+        "stats": get_stats(),
+        "streaks": {
+            "reading": get_reading_streak(),
+            "kefir": get_kefir_streak(),
+            "water": get_water_streak(),
+        },
+        "compliance": get_compliance_rate(days=7),
+        "weekly_calories": {
+            "current": weekly_kcal,
+            "goal": weekly_goal,
+        },
+    }
@@ -1,5 +1,5 @@
 ﻿import axios from 'axios';
-import { Training, DailyLog } from '../types';
+import { Training, DailyLog, TrainingSearchPage, Goal, GoalMetric, GoalPeriod, StreamEventType, HrSeries } from '../types';
 
 const API = axios.create({
   baseURL: import.meta.env.VITE_API_URL || 'http://localhost:5000/api',
@@ -12,8 +12,11 @@ export const dashboardAPI = {
 
 export const trainingsAPI = {
   getAll: (limit = 200) => API.get(`/trainings?limit=${limit}`).then(r => r.data.trainings),
-  add: (data: Omit<Training, 'id'>) => API.post('/trainings', data).then(r => r.data),
+  search: (q: string, cursor?: string | null, limit = 20): Promise<TrainingSearchPage> =>
+    API.get('/trainings/search', { params: { q, limit, cursor: cursor || undefined } }).then(r => r.data),
+  add: (data: Omit<Training, 'id'> & { hr_samples?: number[]; hr_interval_sec?: number }) => API.post('/trainings', data).then(r => r.data),
   get: (id: number) => API.get(`/trainings/${id}`).then(r => r.data),
+  getHr: (id: number, samples = true): Promise<HrSeries> => API.get(`/trainings/${id}/hr`, { params: { samples: samples ? 1 : 0 } }).then(r => r.data),
   delete: (id: number) => API.delete(`/trainings/${id}`).then(r => r.data)
 };
 
@@ -25,3 +28,19 @@ export const dailyAPI = {
   logKefir: (date: string, glasses: number) => API.post('/daily/kefir', { date, glasses }).then(r => r.data),
   logNoPhoneAfter21: (date: string, success: boolean) => API.post('/daily/no_phone_after_21', { date, success }).then(r => r.data)
 };
+
+export const goalsAPI = {
+  getAll: (): Promise<Goal[]> => API.get('/goals').then(r => r.data.goals),
+  set: (metric: GoalMetric, period: GoalPeriod, target: number) => API.post('/goals', { metric, period, target }).then(r => r.data),
+  delete: (id: number) => API.delete(`/goals/${id}`).then(r => r.data)
+};
+
+export const streamAPI = {
+  // Live updates over server-sent events; returns unsubscribe function
+  subscribe: (onEvent: (type: StreamEventType, data: any) => void) => {
+    const source = new EventSource(`${API.defaults.baseURL}/stream`);
+    const types: StreamEventType[] = ['training.added', 'training.deleted', 'daily_log.updated', 'goals.updated', 'resync'];
+    types.forEach(type => source.addEventListener(type, e => onEvent(type, JSON.parse((e as MessageEvent).data))));
+    return () => source.close();
+  }
+};
@@ -9,6 +9,36 @@ export interface Training {
   notes: string;
 }
 
+export interface HrAnalysis {
+  hr_max: number;
+  samples: number;
+  duration_sec: number;
+  min_hr: number;
+  avg_hr: number;
+  max_hr: number;
+  std_hr: number;
+  drift_pct: number;
+  zones_sec: number[]; // [below zone 1, zone 1..5]
+}
+
+export interface HrSeries {
+  training_id: number;
+  interval_sec: number;
+  analysis: HrAnalysis;
+  samples?: number[];
+}
+
+export interface TrainingSearchResult extends Training {
+  snippet: string; // notes fragment, matches wrapped in <mark>
+  rank: number;
+}
+
+export interface TrainingSearchPage {
+  results: TrainingSearchResult[];
+  count: number;
+  next_cursor: string | null;
+}
+
 export interface DailyLog {
   date: string;
   reading_minutes?: number;
@@ -19,4 +49,25 @@ export interface DailyLog {
   mood_score?: number;
 }
 
+export type GoalMetric =
+  | 'trainings' | 'calories' | 'duration_min'
+  | 'reading_minutes' | 'water_glasses' | 'kefir_glasses' | 'no_phone_after_21';
+
+export type GoalPeriod = 'day' | 'week' | 'month';
+
+export interface Goal {
+  id: number;
+  metric: GoalMetric;
+  period: GoalPeriod;
+  target: number;
+  period_start: string; // ISO date of first day in current period
+  current: number;
+  percent: number;
+  achieved: boolean;
+}
+
+export type StreamEventType =
+  | 'training.added' | 'training.deleted' | 'daily_log.updated' | 'goals.updated'
+  | 'resync'; // missed too many events - refetch everything
+
 export type View = 'Dashboard' | 'AddTraining' | 'History' | 'Charts' | 'Calendar';